@@ -59,7 +59,14 @@ def main(cfg: DictConfig):
     # Load model
     litmodel = LitParadis(datamodule, cfg)
     if cfg.model.checkpoint_path:
-        checkpoint = torch.load(cfg.model.checkpoint_path, weights_only=True)
+        # Memory-map the checkpoint and materialize it directly on the
+        # target device instead of staging a full copy in host RAM
+        checkpoint = torch.load(
+            cfg.model.checkpoint_path,
+            map_location=device,
+            weights_only=True,
+            mmap=True,
+        )
         litmodel.load_state_dict(checkpoint["state_dict"])
     else:
         raise ValueError(
@@ -6,6 +6,8 @@ The implementation assumes:
 - The grid does not include poles
 """
 
+from typing import Optional
+
 import torch
 
 
@@ -16,8 +18,18 @@ class GeoCyclicPadding(torch.nn.Module):
         super().__init__()
         self.pad_width = pad_width
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        """Apply cyclic padding to the input tensor."""
+    def forward(
+        self, x: torch.Tensor, out: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """Apply cyclic padding to the input tensor.
+
+        The padded result is assembled with slice copies into a single
+        output tensor rather than chained torch.cat calls, which avoids an
+        intermediate latitude-padded allocation.  Callers may pass a
+        preallocated ``out`` buffer to reuse across calls, but only when
+        the result does not participate in autograd (e.g. inference),
+        since later calls overwrite it in place.
+        """
         # Validate input dimensions
         assert (
             len(x.shape) == 4
@@ -25,22 +37,36 @@ class GeoCyclicPadding(torch.nn.Module):
         batch_size, channels, height, width = x.shape
         assert width % 2 == 0, "Number of longitude points must be even"
 
+        pad = self.pad_width
+
         # For latitude padding, we need to rotate by 180° and account for longitude padding
         middle_index = width // 2
 
-        # Apply 180° shift
-        top_padding = torch.roll(
-            x[:, :, : self.pad_width, :], shifts=middle_index, dims=3
-        )
-        bottom_padding = torch.roll(
-            x[:, :, -self.pad_width :, :], shifts=middle_index, dims=3
-        )
-        x = torch.cat([top_padding.flip(2), x, bottom_padding.flip(2)], dim=2)
-
-        # Longitude periodic padding
-        x_padded = torch.cat(
-            [x[:, :, :, -self.pad_width :], x, x[:, :, :, : self.pad_width]], dim=3
-        )
-
-        # Combine padded regions
-        return x_padded
+        if out is None:
+            out = x.new_empty(batch_size, channels, height + 2 * pad, width + 2 * pad)
+
+        # Interior
+        out[:, :, pad : pad + height, pad : pad + width] = x
+
+        # Latitude padding: apply a 180° shift and mirror towards the pole.
+        # The shift is written as two half-width copies straight from the
+        # source strips, avoiding the rolled-strip temporary
+        top = x[:, :, :pad, :]
+        bottom = x[:, :, -pad:, :]
+        if pad > 1:
+            top = top.flip(2)
+            bottom = bottom.flip(2)
+        out[:, :, :pad, pad : pad + middle_index] = top[:, :, :, middle_index:]
+        out[:, :, :pad, pad + middle_index : pad + width] = top[:, :, :, :middle_index]
+        out[:, :, pad + height :, pad : pad + middle_index] = bottom[
+            :, :, :, middle_index:
+        ]
+        out[:, :, pad + height :, pad + middle_index : pad + width] = bottom[
+            :, :, :, :middle_index
+        ]
+
+        # Longitude periodic padding wraps the already-filled rows
+        out[:, :, :, :pad] = out[:, :, :, width : width + pad]
+        out[:, :, :, pad + width :] = out[:, :, :, pad : 2 * pad]
+
+        return out
@@ -1,19 +1,111 @@
 """Physically inspired neural architecture for the weather forecasting model."""
 
+import math
+
 import torch
 from torch import nn
+from torch.utils.checkpoint import checkpoint
 
 from model.clp_block import CLP
 from model.clp_variational import VariationalCLP
 from model.padding import GeoCyclicPadding
 
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
+
+# Precomputed once at import so the per-substep hot path never rebuilds
+# them.  As Python floats they are passed to the pointwise kernels as
+# immediate arguments, with no per-call host-to-device transfer
+_TWO_PI = 2.0 * math.pi
+_INV_TWO_PI = 1.0 / _TWO_PI
+
+
+def _transform_to_latlon(
+    lat_prime: torch.Tensor,
+    lon_prime: torch.Tensor,
+    sin_lat_p: torch.Tensor,
+    cos_lat_p: torch.Tensor,
+    lon_p: torch.Tensor,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Transform from local rotated coordinates back to standard latlon coordinates.
+
+    A free function of pure pointwise ops, so torch.compile fuses the
+    trigonometric chain into a single kernel instead of materializing
+    each intermediate.  The pole coordinates are supplied as precomputed
+    sin/cos of the static grid and may carry broadcast dimensions (e.g.
+    [1, 1, lat, lon] against [batch, channels, lat, lon] rotated
+    coordinates), in which case only the combined terms expand to the
+    full shape.
+    """
+    # Pre-compute trigonometric functions of the rotated coordinates
+    sin_lat_prime = torch.sin(lat_prime)
+    cos_lat_prime = torch.cos(lat_prime)
+    sin_lon_prime = torch.sin(lon_prime)
+    cos_lon_prime = torch.cos(lon_prime)
+
+    # Compute standard latitude.  The atan2 form is equivalent to
+    # arcsin(clamp(sin_lat, -1, 1)) but avoids the separate clamp on
+    # sin_lat itself.  The small positive floor keeps the sqrt away from
+    # zero, where its backward would emit inf: in fp32 a departure point
+    # at a pole rounds sin_lat to exactly +/-1 (or just beyond)
+    sin_lat = sin_lat_prime * cos_lat_p + cos_lat_prime * cos_lon_prime * sin_lat_p
+    cos_lat = torch.sqrt(torch.clamp(1.0 - sin_lat * sin_lat, min=1e-12))
+    lat = torch.atan2(sin_lat, cos_lat)
+
+    # Compute standard longitude
+    num = cos_lat_prime * sin_lon_prime
+    den = cos_lat_prime * cos_lon_prime * cos_lat_p - sin_lat_prime * sin_lat_p
+
+    lon = lon_p + torch.atan2(num, den)
+
+    # Normalize longitude to [0, 2π] (floor form fuses more cleanly than
+    # torch.remainder in the pointwise chain)
+    lon = lon - _TWO_PI * torch.floor(lon * _INV_TWO_PI)
+
+    return lat, lon
+
+
+def _apply_grid_periodicity(
+    grid_x: torch.Tensor,
+    grid_y: torch.Tensor,
+    pad_scale_x: float,
+    pad_scale_y: float,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Map departure-point grid coordinates back into the [-1, 1] sampling range.
+
+    Branchless sign/abs arithmetic replaces the mask-and-select
+    formulation so the whole fixup fuses into one kernel without
+    materializing boolean masks.  The final rescale by mesh/padded-mesh
+    keeps the interpolation in range after padding and rides along in
+    the same fused kernel.
+    """
+    # Apply periodicity for outside values along longitude set to [-1, 1]
+    grid_x = (grid_x + 1.0) - 2.0 * torch.floor((grid_x + 1.0) * 0.5) - 1.0
+
+    # Apply geocyclic longitude roll (a half-domain shift) for values beyond
+    # +/-90 degrees latitude
+    over_pole = (torch.abs(grid_y) > 1.0).to(grid_x.dtype)
+    grid_x = grid_x - torch.sign(grid_x) * over_pole
+
+    # Mirror values outside of the range [-1, 1] along the latitude direction
+    grid_y = grid_y - 2.0 * torch.sign(grid_y) * torch.clamp(
+        torch.abs(grid_y) - 1.0, min=0.0
+    )
+
+    # Make sure interpolation remains in right range after padding
+    return grid_x * pad_scale_x, grid_y * pad_scale_y
 
 
 class NeuralSemiLagrangian(nn.Module):
     """Implements the semi-Lagrangian advection."""
 
-    def __init__(self, hidden_dim: int, mesh_size: tuple, variational: bool):
+    def __init__(
+        self,
+        hidden_dim: int,
+        mesh_size: tuple,
+        lat_grid: torch.Tensor,
+        lon_grid: torch.Tensor,
+        variational: bool,
+    ):
         super().__init__()
 
         # For cubic interpolation
@@ -24,6 +116,39 @@ class NeuralSemiLagrangian(nn.Module):
         # Flag for variational variant to be used in forward
         self.variational = variational
 
+        # Lazily allocated interpolation-grid and padded-feature buffers
+        # reused across substeps in inference (see forward)
+        self._grid_buf = None
+        self._padded_buf = None
+
+        # The lat/lon grid is fixed, so cache it and its normalization bounds
+        # as buffers instead of recomputing the reductions every substep
+        self.register_buffer("lon_grid", lon_grid[None, None], persistent=False)
+        self.register_buffer(
+            "sin_lat_grid", torch.sin(lat_grid)[None, None], persistent=False
+        )
+        self.register_buffer(
+            "cos_lat_grid", torch.cos(lat_grid)[None, None], persistent=False
+        )
+        min_lat, max_lat = torch.min(lat_grid), torch.max(lat_grid)
+        min_lon, max_lon = torch.min(lon_grid), torch.max(lon_grid)
+
+        # Fold the [-1, 1] normalization of the departure points into a
+        # single multiply-add with precomputed constants
+        self.register_buffer("x_scale", 2.0 / (max_lon - min_lon), persistent=False)
+        self.register_buffer(
+            "x_shift", -2.0 * min_lon / (max_lon - min_lon) - 1.0, persistent=False
+        )
+        self.register_buffer("y_scale", 2.0 / (max_lat - min_lat), persistent=False)
+        self.register_buffer(
+            "y_shift", -2.0 * min_lat / (max_lat - min_lat) - 1.0, persistent=False
+        )
+
+        # Static rescale from the mesh to its padded extent, applied after
+        # the periodicity fixup
+        self.pad_scale_x = mesh_size[1] / (mesh_size[1] + 2 * self.padding)
+        self.pad_scale_y = mesh_size[0] / (mesh_size[0] + 2 * self.padding)
+
         # Neural network that will learn an effective velocity along the trajectory
         # Output 2 channels per hidden dimension for u and v
         if not self.variational:
@@ -31,122 +156,106 @@ class NeuralSemiLagrangian(nn.Module):
         else:
             self.velocity_net = VariationalCLP(hidden_dim, 2 * hidden_dim, mesh_size)
 
-    def _transform_to_latlon(
-        self,
-        lat_prime: torch.Tensor,
-        lon_prime: torch.Tensor,
-        lat_p: torch.Tensor,
-        lon_p: torch.Tensor,
-    ) -> tuple:
-        """Transform from local rotated coordinates back to standard latlon coordinates."""
-        # Pre-compute trigonometric functions
-        sin_lat_prime = torch.sin(lat_prime)
-        cos_lat_prime = torch.cos(lat_prime)
-        sin_lon_prime = torch.sin(lon_prime)
-        cos_lon_prime = torch.cos(lon_prime)
-        sin_lat_p = torch.sin(lat_p)
-        cos_lat_p = torch.cos(lat_p)
-
-        # Compute standard latitude
-        sin_lat = sin_lat_prime * cos_lat_p + cos_lat_prime * cos_lon_prime * sin_lat_p
-        lat = torch.arcsin(torch.clamp(sin_lat, -1 + 1e-7, 1 - 1e-7))
-
-        # Compute standard longitude
-        num = cos_lat_prime * sin_lon_prime
-        den = cos_lat_prime * cos_lon_prime * cos_lat_p - sin_lat_prime * sin_lat_p
-
-        lon = lon_p + torch.atan2(num, den)
-
-        # Normalize longitude to [0, 2π]
-        lon = torch.remainder(lon + 2 * torch.pi, 2 * torch.pi)
-
-        return lat, lon
-
     def forward(
         self,
         hidden_features: torch.Tensor,
-        lat_grid: torch.Tensor,
-        lon_grid: torch.Tensor,
         dt: float,
     ) -> Union[torch.Tensor, Tuple[torch.Tensor,torch.Tensor]]:
         """Compute advection using rotated coordinate system."""
         batch_size = hidden_features.shape[0]
-        kl_loss = torch.tensor(0.0)
 
-        # Get learned velocities for each channel
+        # Get learned velocities for each channel.  The KL loss stays on the
+        # same device as the features; a host-side scalar here would force a
+        # transfer and sync every substep
         if self.variational:
             velocities, kl_loss = self.velocity_net(hidden_features)
         else:
             velocities = self.velocity_net(hidden_features)
 
-        # Reshape velocities to separate u,v components per channel
-        # [batch, 2*hidden_dim, lat, lon] -> [batch, hidden_dim, 2, lat, lon]
-        velocities = velocities.view(
-            batch_size, 2, self.hidden_dim, *velocities.shape[-2:]
+        # Compute departure points in a local rotated coordinate system in
+        # which the origin of latitude and longitude is moved to the arrival
+        # point.  The sign and time step are applied in a single fused
+        # scaling of the full velocity tensor rather than once per
+        # component; folding -dt into the net itself is not possible since
+        # the CLP velocity net ends in an activation, not a linear layer
+        velocities = velocities * (-dt)
+
+        # Split u,v components per channel: the first hidden_dim output
+        # channels are u and the rest are v, so halving along the channel
+        # dimension yields two zero-copy [batch, hidden_dim, lat, lon]
+        # views of the already-scaled tensor; the downstream pointwise ops
+        # do not need them to be contiguous
+        lon_prime, lat_prime = torch.chunk(velocities, 2, dim=1)
+
+        # Transform from rotated coordinates back to standard coordinates.
+        # The [1, 1, lat, lon] grid buffers broadcast against the
+        # per-channel coordinates, so the static-grid trig is paid once at
+        # setup rather than every substep
+        lat_dep, lon_dep = _transform_to_latlon(
+            lat_prime, lon_prime, self.sin_lat_grid, self.cos_lat_grid, self.lon_grid
         )
 
-        # Extract u,v components
-        u = velocities[:, 0]  # [batch, hidden_dim, lat, lon]
-        v = velocities[:, 1]
+        grid_x = lon_dep * self.x_scale + self.x_shift
+        grid_y = lat_dep * self.y_scale + self.y_shift
 
-        # Compute departure points in a local rotated coordinate system in which the origin
-        # of latitude and longitude is moved to the arrival point
-        lon_prime = -u * dt
-        lat_prime = -v * dt
-
-        # Transform from rotated coordinates back to standard coordinates
-        # Expand lat/lon grid for broadcasting with per-channel coordinates
-        lat_grid = lat_grid.unsqueeze(1).expand(-1, self.hidden_dim, -1, -1)
-        lon_grid = lon_grid.unsqueeze(1).expand(-1, self.hidden_dim, -1, -1)
-
-        # Get the max and min values for normalization
-        min_lat = torch.min(lat_grid)
-        max_lat = torch.max(lat_grid)
-
-        min_lon = torch.min(lon_grid)
-        max_lon = torch.max(lon_grid)
-
-        lat_dep, lon_dep = self._transform_to_latlon(
-            lat_prime, lon_prime, lat_grid, lon_grid
+        # Wrap, roll and mirror the departure points back into [-1, 1],
+        # then rescale to the padded mesh
+        grid_x, grid_y = _apply_grid_periodicity(
+            grid_x, grid_y, self.pad_scale_x, self.pad_scale_y
         )
 
-        grid_x = 2 * (lon_dep - min_lon) / (max_lon - min_lon) - 1
-        grid_y = 2 * (lat_dep - min_lat) / (max_lat - min_lat) - 1
-
-        # Apply periodicity for outside values along longitude set to [-1, 1]
-        grid_x = torch.remainder(grid_x + 1, 2) - 1
-
-        # Apply geocyclic longitude roll for values beyond +/-90 degrees latitude
-        geo_mask_left = grid_x <= 0
-        geo_mask_right = grid_x > 0
-        lat_mask_outer = torch.abs(grid_y) > 1
-        grid_x = torch.where(lat_mask_outer & geo_mask_left, grid_x + 1, grid_x)
-        grid_x = torch.where(lat_mask_outer & geo_mask_right, grid_x - 1, grid_x)
-
-        # Mirror values outside of the range [-1, 1] along the latitude direction
-        grid_y = torch.where(grid_y < -1, -(2 + grid_y), grid_y)
-        grid_y = torch.where(grid_y > 1, 2 - grid_y, grid_y)
-
         # Reshape grid coordinates for interpolation
         # [batch, dynamic_channels, lat, lon] -> [batch*dynamic_channels, lat, lon]
         grid_x = grid_x.view(batch_size * self.hidden_dim, *grid_x.shape[-2:])
         grid_y = grid_y.view(batch_size * self.hidden_dim, *grid_y.shape[-2:])
 
-        # Apply padding and reshape hidden features
-        dynamic_padded = self.padding_interp(hidden_features)
-
-        # Make sure interpolation remains in right range after padding
-        grid_x = grid_x * hidden_features.size(-1) / dynamic_padded.size(-1)
-        grid_y = grid_y * hidden_features.size(-2) / dynamic_padded.size(-2)
-
-        # Create interpolation grid
-        grid = torch.stack([grid_x, grid_y], dim=-1)
-
-        # Apply padding and reshape hidden features
-        dynamic_padded = self.padding_interp(hidden_features)
-
-        # Apply padding and reshape features
-        dynamic_padded = dynamic_padded.reshape(
+        # Apply padding, reusing a preallocated buffer across substeps in
+        # inference; while training each substep needs a fresh tensor since
+        # the padded features are saved for the grid_sample backward
+        if torch.is_grad_enabled():
+            dynamic_padded = self.padding_interp(hidden_features)
+        else:
+            padded_shape = (
+                batch_size,
+                self.hidden_dim,
+                hidden_features.shape[-2] + 2 * self.padding,
+                hidden_features.shape[-1] + 2 * self.padding,
+            )
+            if (
+                self._padded_buf is None
+                or self._padded_buf.shape != padded_shape
+                or self._padded_buf.device != hidden_features.device
+                or self._padded_buf.dtype != hidden_features.dtype
+            ):
+                self._padded_buf = hidden_features.new_empty(padded_shape)
+            dynamic_padded = self.padding_interp(hidden_features, out=self._padded_buf)
+
+        # Create interpolation grid.  While training, autograd saves the grid
+        # for the grid_sample backward, so each substep needs a fresh tensor.
+        # In inference the shapes are stable across substeps, so write both
+        # components into one preallocated buffer instead of interleaving
+        # them with a stack: this avoids allocator churn and keeps the
+        # pointer stable for CUDA-graph replay.
+        if torch.is_grad_enabled():
+            grid = torch.stack([grid_x, grid_y], dim=-1)
+        else:
+            if (
+                self._grid_buf is None
+                or self._grid_buf.shape[:-1] != grid_x.shape
+                or self._grid_buf.device != grid_x.device
+            ):
+                self._grid_buf = torch.empty(
+                    *grid_x.shape, 2, device=grid_x.device, dtype=grid_x.dtype
+                )
+            self._grid_buf[..., 0].copy_(grid_x)
+            self._grid_buf[..., 1].copy_(grid_y)
+            grid = self._grid_buf
+
+        # Fold channels into the batch dimension for the per-channel
+        # grid_sample.  The padded tensor is assembled contiguously, so this
+        # is a free reinterpretation; view (unlike reshape) raises rather
+        # than silently copying if that ever stops holding
+        dynamic_padded = dynamic_padded.view(
             batch_size * self.hidden_dim, 1, *dynamic_padded.shape[-2:]
         )
 
@@ -202,8 +311,27 @@ class Paradis(nn.Module):
         self.num_substeps = cfg.model.num_substeps
         self.dt = cfg.model.base_dt / self.SYNOPTIC_TIME_SCALE / self.num_substeps
 
+        # Optionally run the substep loop under bfloat16 autocast: the
+        # advection pipeline is memory-bound, so halving the bytes per
+        # element roughly doubles its effective bandwidth while keeping
+        # fp32 dynamic range
+        self.bf16_substeps = cfg.compute.get("bf16_substeps", False)
+
+        # Optionally recompute the advection activations during backward
+        # instead of storing them for every substep, trading extra forward
+        # FLOPs for roughly num_substeps-times less activation memory
+        self.checkpoint_advection = cfg.compute.get("checkpoint_advection", False)
+
+        # Build the static lat/lon grid in radians, matching the coordinate
+        # channels produced by the dataset
+        lat_rad = torch.deg2rad(datamodule.lat.to(torch.float32))
+        lon_rad = torch.deg2rad(datamodule.lon.to(torch.float32))
+        lat_grid, lon_grid = torch.meshgrid(lat_rad, lon_rad, indexing="ij")
+
         # Advection layer
-        self.advection = NeuralSemiLagrangian(hidden_dim, mesh_size, self.variational)
+        self.advection = NeuralSemiLagrangian(
+            hidden_dim, mesh_size, lat_grid, lon_grid, self.variational
+        )
 
         # Diffusion-reaction layer
         self.diffusion_reaction = CLP(
@@ -216,12 +344,68 @@ class Paradis(nn.Module):
             nn.Conv2d(hidden_dim, output_dim, kernel_size=3),
         )
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        # Optionally compile the whole substep loop as a single static-shape
+        # graph: the loop has no data-dependent control flow (the
+        # variational branch is fixed at init), so TorchDynamo unrolls it
+        # and Inductor fuses the elementwise advection arithmetic and
+        # captures the replay as one CUDA graph.  Shapes are static after
+        # setup, so dynamic shape tracing is disabled.
+        if cfg.compute.get("compile_substeps", False):
+            self._substep = torch.compile(
+                self._substep_loop,
+                mode="reduce-overhead",
+                fullgraph=True,
+                dynamic=False,
+            )
+        else:
+            self._substep = self._substep_loop
+
+    def _substep_loop(
+        self, z: torch.Tensor
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Run the advection/diffusion-reaction substeps on the latent state."""
+        # Accumulated on-device across substeps in the variational variant
+        kl_loss = None
+
+        with torch.autocast(
+            device_type=z.device.type,
+            dtype=torch.bfloat16,
+            enabled=self.bf16_substeps,
+        ):
+            for i in range(self.num_substeps):
+                # Advect the features in latent space using a Semi-Lagrangian
+                # step, optionally without storing its activations (the
+                # diffusion-reaction CLP stays un-checkpointed)
+                if self.checkpoint_advection and torch.is_grad_enabled():
+                    adv_out = checkpoint(
+                        self.advection, z, self.dt, use_reentrant=False
+                    )
+                else:
+                    adv_out = self.advection(z, self.dt)
+
+                if self.variational:
+                    z_adv, kl_step = adv_out
+                    kl_loss = kl_step if kl_loss is None else kl_loss + kl_step
+                else:
+                    z_adv = adv_out
+
+                # Compute the diffusion residual
+                dz = self.diffusion_reaction(z_adv)
+
+                # Update the latent space features without materializing the
+                # z_adv + dt * dz temporary.  The checkpointed path must
+                # leave z unmodified so backward can replay the advection
+                # from it, so there the first add runs out of place
+                if self.checkpoint_advection and torch.is_grad_enabled():
+                    z = torch.add(z, z_adv).add_(dz, alpha=self.dt)
+                else:
+                    z.add_(z_adv).add_(dz, alpha=self.dt)
+
+        return z, kl_loss
 
-        # Extract lat/lon from static features (last 2 channels)
-        x_static = x[:, self.num_dynamic_channels :]
-        lat_grid = x_static[:, -2, :, :]
-        lon_grid = x_static[:, -1, :, :]
+    def forward(
+        self, x: torch.Tensor
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
 
         # Project features to latent space
         z = self.input_proj(x)
@@ -229,16 +413,18 @@ class Paradis(nn.Module):
         # Keep a copy for the residual projection
         z0 = z.clone()
 
-        # Compute advection and diffusion-reaction
-        for i in range(self.num_substeps):
-            # Advect the features in latent space using a Semi-Lagrangian step
-            z_adv = self.advection(z, lat_grid, lon_grid, self.dt)
+        # Compute advection and diffusion-reaction (compiled to a single
+        # graph when compute.compile_substeps is enabled)
+        z, kl_loss = self._substep(z)
 
-            # Compute the diffusion residual
-            dz = self.diffusion_reaction(z_adv)
-
-            # Update the latent space features
-            z += z_adv + self.dt * dz
+        # Residual in latent space; z is dead after the substep loop, so
+        # reuse its storage instead of allocating z - z0
+        z.sub_(z0)
 
         # Return a scaled residual formulation
-        return x[:, : self.num_common_features] + self.output_proj(z - z0)
+        output = x[:, : self.num_common_features] + self.output_proj(z)
+
+        if self.variational:
+            return output, kl_loss
+
+        return output